@@ -0,0 +1,14 @@
+# _config.py
+import configparser
+import os
+from functools import lru_cache
+
+config_file_path = os.path.join(os.path.dirname(__file__), 'config.ini')
+
+
+# Load configuration from the .ini file once per process
+@lru_cache(maxsize=1)
+def get_config():
+    config = configparser.ConfigParser()
+    config.read(config_file_path)
+    return config
@@ -1,77 +1,146 @@
 # cloudflare_module.py
-import configparser
-import os
+import bisect
+import json
+import re
+import socket
+import struct
+import urllib.parse
+from functools import lru_cache
 
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 
-
-def load_config_file(filepath):
-    config = configparser.ConfigParser()
-    config.read(filepath)
-    return config
-
+from _config import get_config
 
 # Load configuration
-config_file_path = os.path.join(os.path.dirname(__file__), 'config.ini')
-config = load_config_file(config_file_path)
+config = get_config()
 
 CLOUDFLARE_API_TOKEN = config.get('cloudflare', 'CLOUDFLARE_API_TOKEN')
 CLOUDFLARE_ZONE_ID = config.get('cloudflare', 'CLOUDFLARE_ZONE_ID')
 CLOUDFLARE_RECORD_NAME = config.get('cloudflare', 'CLOUDFLARE_RECORD_NAME')
 
+# API URLs and record fields never change within a process, so build them once
+_ZONE_DNS_URL = f'https://api.cloudflare.com/client/v4/zones/{CLOUDFLARE_ZONE_ID}/dns_records'
+_ZONE_DNS_QUERY = f'{_ZONE_DNS_URL}?type=A&name={urllib.parse.quote(CLOUDFLARE_RECORD_NAME)}'
+_DNS_RECORD_TEMPLATE = {
+    'type': 'A',
+    'name': CLOUDFLARE_RECORD_NAME,
+    'ttl': 120,
+    'proxied': False
+}
+
+# Cloudflare API calls go straight through a urllib3 pool, skipping the requests layer
+_CF_HEADERS = {
+    'Authorization': f'Bearer {CLOUDFLARE_API_TOKEN}',
+    'Content-Type': 'application/json'
+}
+_cf_http = urllib3.PoolManager(num_pools=2, maxsize=4, headers=_CF_HEADERS,
+                               timeout=urllib3.Timeout(10), retries=False)
+
+# Address blocks that can never be a valid public IPv4 address, as sorted
+# parallel tuples of first and last address integers for bisect lookups
+_RESERVED_IPV4_STARTS = (
+    0x00000000,  # 0.0.0.0/8
+    0x0A000000,  # 10.0.0.0/8
+    0x7F000000,  # 127.0.0.0/8
+    0xA9FE0000,  # 169.254.0.0/16
+    0xAC100000,  # 172.16.0.0/12
+    0xC0A80000,  # 192.168.0.0/16
+    0xE0000000,  # 224.0.0.0/4
+    0xF0000000,  # 240.0.0.0/4
+)
+_RESERVED_IPV4_ENDS = (
+    0x00FFFFFF,
+    0x0AFFFFFF,
+    0x7FFFFFFF,
+    0xA9FEFFFF,
+    0xAC1FFFFF,
+    0xC0A8FFFF,
+    0xEFFFFFFF,
+    0xFFFFFFFF,
+)
+
+# Cloudflare error code returned when a DNS record ID no longer exists
+RECORD_NOT_FOUND_ERROR_CODE = 81044
+
+# DNS record IDs keyed on (zone ID, record name), so updates can skip the lookup
+_record_id_cache = {}
+
+# Dotted-quad shape check, cheaper than letting inet_aton raise on obvious garbage.
+# Leading zeros are rejected because inet_aton reads them as octal.
+_IPV4_RE = re.compile(r'(?:0|[1-9]\d{0,2})(?:\.(?:0|[1-9]\d{0,2})){3}', re.ASCII)
+
+# Separate session for the public IP lookup so it keeps its own connection alive
+_ip_session = requests.Session()
+_ip_session.headers.update({'User-Agent': 'curtsddns'})
+_ip_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+
+def _is_public_ipv4(ip_str):
+    # Shape check first, so arbitrary response bodies never end up in the cache
+    return _IPV4_RE.fullmatch(ip_str) is not None and _is_public_dotted_quad(ip_str)
+
+
+@lru_cache(maxsize=256)
+def _is_public_dotted_quad(ip_str):
+    try:
+        ip_int = struct.unpack('!I', socket.inet_aton(ip_str))[0]
+    except OSError:
+        return False
+    i = bisect.bisect_right(_RESERVED_IPV4_STARTS, ip_int) - 1
+    return i < 0 or ip_int > _RESERVED_IPV4_ENDS[i]
+
 
 def get_public_ip():
-    response = requests.get('https://checkmyip.app/')
-    return response.text.strip()
+    response = _ip_session.get('https://checkmyip.app/', timeout=10)
+    public_ip = response.text.strip()
+    if not _is_public_ipv4(public_ip):
+        raise Exception(f"Public IP lookup returned an invalid address: {public_ip[:64]!r}")
+    return public_ip
 
 
 def get_existing_dns_ip():
-    headers = {
-        'Authorization': f'Bearer {CLOUDFLARE_API_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-
-    url = f'https://api.cloudflare.com/client/v4/zones/{CLOUDFLARE_ZONE_ID}/dns_records?type=A&name={CLOUDFLARE_RECORD_NAME}'
-    response = requests.get(url, headers=headers)
-    response_data = response.json()
+    response = _cf_http.request('GET', _ZONE_DNS_QUERY)
+    response_data = json.loads(response.data)
 
     if response_data['success']:
-        return response_data['result'][0]['content']
+        record = response_data['result'][0]
+        _record_id_cache[(CLOUDFLARE_ZONE_ID, CLOUDFLARE_RECORD_NAME)] = record['id']
+        return record['content']
     else:
         raise Exception(f"Failed to fetch existing DNS record IP. Error: {response_data['errors']}")
 
 
 def update_dns(ip_address):
-    headers = {
-        'Authorization': f'Bearer {CLOUDFLARE_API_TOKEN}',
-        'Content-Type': 'application/json'
-    }
+    cache_key = (CLOUDFLARE_ZONE_ID, CLOUDFLARE_RECORD_NAME)
+    record_id = _record_id_cache.get(cache_key)
+    from_cache = record_id is not None
 
-    # Get the DNS record ID
-    url = f'https://api.cloudflare.com/client/v4/zones/{CLOUDFLARE_ZONE_ID}/dns_records?type=A&name={CLOUDFLARE_RECORD_NAME}'
-    response = requests.get(url, headers=headers)
-    response_data = response.json()
+    if not from_cache:
+        # Get the DNS record ID
+        response = _cf_http.request('GET', _ZONE_DNS_QUERY)
+        response_data = json.loads(response.data)
+
+        if not response_data['success']:
+            return {'status': 'failure',
+                    'message': f"Failed to fetch existing DNS record ID. Error: {response_data['errors']}"}
 
-    if response_data['success']:
         record_id = response_data['result'][0]['id']
+        _record_id_cache[cache_key] = record_id
 
-        # Update the DNS record with the new IP address
-        dns_data = {
-            'type': 'A',
-            'name': CLOUDFLARE_RECORD_NAME,
-            'content': ip_address,
-            'ttl': 120,
-            'proxied': False
-        }
-
-        update_url = f'https://api.cloudflare.com/client/v4/zones/{CLOUDFLARE_ZONE_ID}/dns_records/{record_id}'
-        update_response = requests.put(update_url, headers=headers, json=dns_data)
-        update_response_data = update_response.json()
-
-        if update_response_data["success"]:
-            return {'status': 'success', 'message': 'DNS updated successfully'}
-        else:
-            return {'status': 'failure', 'message': f"Failed to update DNS. Error: {update_response_data['errors']}"}
-    else:
-        return {'status': 'failure',
-                'message': f"Failed to fetch existing DNS record ID. Error: {response_data['errors']}"}
+    # Update the DNS record with the new IP address
+    dns_data = {**_DNS_RECORD_TEMPLATE, 'content': ip_address}
+    update_response = _cf_http.request('PUT', f'{_ZONE_DNS_URL}/{record_id}', body=json.dumps(dns_data).encode())
+    update_response_data = json.loads(update_response.data)
+
+    if update_response_data["success"]:
+        return {'status': 'success', 'message': 'DNS updated successfully'}
+
+    if from_cache and any(error.get('code') == RECORD_NOT_FOUND_ERROR_CODE
+                          for error in update_response_data['errors']):
+        # The cached record ID is stale, look it up again and retry once
+        _record_id_cache.pop(cache_key, None)
+        return update_dns(ip_address)
+
+    return {'status': 'failure', 'message': f"Failed to update DNS. Error: {update_response_data['errors']}"}
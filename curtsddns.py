@@ -1,33 +1,88 @@
-import configparser
-import os
+import signal
+import socket
+import threading
 import time
-import requests
-
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-# Function to load configuration from an .ini file
-def load_config_file(filepath):
-    config = configparser.ConfigParser()
-    config.read(filepath)
-    return config
+import requests
 
+from _config import get_config
 
 # Load configuration
-config_file_path = os.path.join(os.path.dirname(__file__), 'config.ini')
-config = load_config_file(config_file_path)
+config = get_config()
 DNS_PROVIDER = config.get('settings', 'DNS_PROVIDER')
 CHECK_INTERVAL = config.getint('settings', 'CHECK_INTERVAL', fallback=60)
+RESOLVER_CACHE = config.getboolean('settings', 'RESOLVER_CACHE', fallback=True)
 # Import the appropriate module based on DNS_PROVIDER
 if DNS_PROVIDER == 'cloudflare':
     from cloudflare_module import get_public_ip, get_existing_dns_ip, update_dns
 else:
     raise ValueError(f"Unsupported DNS provider: {DNS_PROVIDER}")
 
+# How long the last known DNS record IP is trusted before asking the provider again
+_DNS_TTL = CHECK_INTERVAL * 10
+_dns_cache = {'value': None, 'ts': 0.0}
+
+
+def get_existing_dns_ip_cached():
+    if _dns_cache['value'] is not None and time.monotonic() - _dns_cache['ts'] < _DNS_TTL:
+        return _dns_cache['value']
+    existing_ip = get_existing_dns_ip()
+    _dns_cache.update(value=existing_ip, ts=time.monotonic())
+    return existing_ip
+
+
+def invalidate_dns_cache():
+    _dns_cache.update(value=None, ts=0.0)
+
+
+# How long resolved host names are reused before asking the system resolver again
+_RESOLVER_TTL = 300
+_system_getaddrinfo = socket.getaddrinfo
+
+
+@lru_cache(maxsize=32)
+def _getaddrinfo_for_window(window, *args):
+    return _system_getaddrinfo(*args)
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    # Results are keyed on the current TTL window, so stale windows age out of the LRU
+    window = int(time.monotonic() // _RESOLVER_TTL)
+    return _getaddrinfo_for_window(window, host, port, family, type, proto, flags)
+
+
+# The public IP and DNS record lookups hit independent hosts, so the public IP
+# lookup runs on this worker while the DNS provider is queried
+_executor = ThreadPoolExecutor(max_workers=1)
+
+# Set by SIGTERM/SIGHUP so the loop stops without waiting out CHECK_INTERVAL.
+# The handler cannot interrupt a blocked socket read, so every call in the loop
+# has to be bounded: each HTTP request has a 10 second timeout and no retries,
+# and the wait for the public IP worker is capped below.
+_shutdown_event = threading.Event()
+_PUBLIC_IP_WAIT = 30
+
+
+def _request_shutdown(signum, frame):
+    _shutdown_event.set()
+
 
 def main():
-    while True:
+    if RESOLVER_CACHE:
+        socket.getaddrinfo = _cached_getaddrinfo
+    for signal_name in ('SIGTERM', 'SIGHUP'):
+        if hasattr(signal, signal_name):
+            signal.signal(getattr(signal, signal_name), _request_shutdown)
+    while not _shutdown_event.is_set():
         try:
-            public_ip = get_public_ip()
-            existing_ip = get_existing_dns_ip()
+            public_ip_future = _executor.submit(get_public_ip)
+            existing_ip = get_existing_dns_ip_cached()
+            try:
+                public_ip = public_ip_future.result(timeout=_PUBLIC_IP_WAIT)
+            except TimeoutError:
+                raise Exception(f"Public IP lookup did not finish within {_PUBLIC_IP_WAIT}s")
             print(f"Current DNS record: {existing_ip}")
             print(f"Current IP address: {public_ip}")
             if public_ip != existing_ip:
@@ -36,8 +91,10 @@ def main():
                 if result:
                     try:
                         if result['status'] == 'success':
+                            _dns_cache.update(value=public_ip, ts=time.monotonic())
                             print(f"Successfully updated DNS record to {public_ip}")
                         else:
+                            invalidate_dns_cache()
                             print("Failed to update DNS record.")
                             print(f"Error: {result.get('message', 'No message provided')}")
                     except KeyError as e:
@@ -50,7 +107,7 @@ def main():
                 print("IP address and DNS record match. No updates needed.")
         except Exception as e:
             print(f"An error occurred during the operation: {str(e)}")
-        time.sleep(CHECK_INTERVAL)  # Check again based on the interval in config
+        _shutdown_event.wait(CHECK_INTERVAL)  # Check again based on the interval in config
 
 
 if __name__ == '__main__':